@@ -12,13 +12,9 @@ This is a fun hack.
 2024-08-19
 
 '''
-from ._utils import _get_globals
+from ._utils import _get_globals, _warn
 
-import warnings
 import sys
-import importlib.abc
-import importlib.machinery
-import importlib.util
 import os
 import pathlib
 
@@ -36,14 +32,31 @@ class RelaModuleNotFound(Warning):
     pass
 
 
-class RelaModuleFinder(importlib.abc.MetaPathFinder):
+class RelaModuleFinder:
+    # A sys.meta_path finder. Not derived from importlib.abc.MetaPathFinder
+    # since importing importlib.abc is slow and we only need find_spec.
 
-    def __init__(self, mod_name, mod_path):
+    def __init__(self, mod_name, mod_path, subpackages=None):
+        ''' subpackages - optional dict of dotted name to directory for the
+            packages below mod_name, these are resolved directly instead
+            of searching through the rest of sys.meta_path
+        '''
         self.mod_name = mod_name
-        self.mod_path = pathlib.Path(mod_path)
-        self.skip = False
+        self.mod_path = os.fspath(mod_path)
         self.found = False
 
+        # precomputed for _resolve_spec
+        self._init_py_str = os.path.join(self.mod_path, '__init__.py')
+        self._parent_str = os.path.dirname(self.mod_path)
+
+        # namespace subpackages are left to the PathFinder
+        self.subpackages = {}
+        for sub_name, sub_path in (subpackages or {}).items():
+            init_py = os.path.join(sub_path, '__init__.py')
+            if os.path.isfile(init_py):
+                parent_dir = os.path.dirname(sub_path)
+                self.subpackages[sub_name] = (parent_dir, init_py)
+
     def __enter__(self):
         sys.meta_path.insert(0, self)
 
@@ -52,43 +65,52 @@ class RelaModuleFinder(importlib.abc.MetaPathFinder):
         sys.meta_path.remove(self)
         if not self.found:
             if self.mod_name not in sys.modules:
-                msg = 'RelaModuleFinder did not provide %r from %r' % (
-                    self.mod_name, self.mod_path)
-                warnings.warn(RelaModuleNotFound(msg), 'once')
+                _warn(RelaModuleNotFound,
+                      lambda: 'RelaModuleFinder did not provide %r from %r' % (
+                          self.mod_name, self.mod_path))
 
     def find_spec(self, fullname, path, target=None):
-
-        if self.skip:
-            return None
-
+        # fast exit, this finder is consulted for every import
+        # made while it is installed
+        if fullname != self.mod_name:
+            sub = self.subpackages.get(fullname)
+            if sub is None:
+                return None
+            parent_dir, init_py = sub
+            # only if the parent package is the one from our directory,
+            # not e.g. an installed one already in sys.modules
+            if path is None or parent_dir not in path:
+                return None
+            import importlib.util
+            return importlib.util.spec_from_file_location(fullname, init_py)
+
+        return self._resolve_spec()
+
+    def _resolve_spec(self):
         spec = None
-        if fullname == self.mod_name:
-
-            init_py = self.mod_path / '__init__.py'
-            if init_py.is_file():
-                spec = importlib.util.spec_from_file_location(
-                    self.mod_name,
-                    str(init_py),
-                )
-
-            elif self.mod_path.is_dir():
-                # we need to hack sys.path. I can't find the right
-                # incantations to make importlib give the correct Namespace package
-                # with type(module.__path__) == _NamespacePath
-
-                # Since we are only importing the toplevel namespace package,
-                # there is no risk of cascaded imports causing a namespace
-                # collision because there is no __init__.py
-
-                p = str(self.mod_path.parent)
-                sys.path.insert(0, p)
-                self.skip = True  # so we don't recurse
-                spec = importlib.util.find_spec(self.mod_name)
-                sys.path.remove(p)
-
-            if spec:
-                self.found = True
-                return spec
+        if os.path.isfile(self._init_py_str):
+            import importlib.util
+            spec = importlib.util.spec_from_file_location(
+                self.mod_name,
+                self._init_py_str,
+            )
+
+        elif os.path.isdir(self.mod_path):
+            # Ask the PathFinder directly for the parent directory, it
+            # gives the correct Namespace package with
+            # type(module.__path__) == _NamespacePath, without changing
+            # sys.path or going through sys.meta_path (and us) again.
+
+            # Since we are only importing the toplevel namespace package,
+            # there is no risk of cascaded imports causing a namespace
+            # collision because there is no __init__.py
+            import importlib.machinery
+            spec = importlib.machinery.PathFinder.find_spec(
+                self.mod_name, [self._parent_str])
+
+        if spec:
+            self.found = True
+            return spec
 
         return None
 
@@ -96,60 +118,74 @@ class RelaModuleFinder(importlib.abc.MetaPathFinder):
 def tive(to):
     """ to - package name or relative dots """
     g = _get_globals()
+    if g.get('__name__') != '__main__':
+        return None
     return _tive(to, g)
 
 def _tive(s, g):
     ''' s - periods or name of module,
-        g - globals dict
+        g - globals dict of __main__
     '''
-    mod = None
-    if g['__name__'] != '__main__':
-        return
+    import importlib.util
 
     fake = os.path.join(os.getcwd(), '__rela__')
     file = g.get('__file__', fake)
 
-    path = pathlib.Path(file)
+    parts = os.path.normpath(file).split(os.sep)
+    stem = os.path.splitext(parts[-1])[0]
 
     periods = s.count('.')
 
     if periods == 0 and s:
-        # try by name instead
-        try:
-            idx = path.parts.index(s)
-        except ValueError:
-            idx = None
+        # try by name instead, searching from the script upwards since
+        # the package is usually near the end of a long path
+        idx = None
+        for i in range(len(parts) - 2, -1, -1):
+            if parts[i] == s:
+                idx = i
+                break
 
         if idx is None:
-            fullpath = str(path)
+            fullpath = os.sep.join(parts)
             msg = f'"{s}" not found in path "{fullpath}"'
             raise FileNotFoundError(msg)
 
         # compute the effective number of periods
-        periods = len(path.parts[idx:]) - 1
+        periods = len(parts[idx:]) - 1
 
-    names = path.parts[-(1+periods):-1]
+    names = parts[-(1+periods):-1]
     name = '.'.join(names)
 
-    parent_dir = path.parts[:-(1+periods)]
-    pdir = os.path.sep.join(parent_dir)
+    parent_dir = parts[:-(1+periods)]
+    pdir = os.sep.join(parent_dir)
+
+    target = os.sep.join(parts[:-periods])
 
-    target = os.path.sep.join(path.parts[:-periods])
+    # the parent packages are already known from the path, so let the
+    # finder provide them instead of having each one search for itself
+    subpackages = {}
+    for i in range(1, len(names)):
+        sub_name = '.'.join(names[:i+1])
+        subpackages[sub_name] = os.sep.join(parts[:len(parts)-periods+i])
 
-    with RelaModuleFinder(names[0], target) as mf:
+    with RelaModuleFinder(names[0], target, subpackages) as mf:
         mod = importlib.import_module(name)
 
     # WARN if we already imported the current script before executing it.
-    me = '.'.join(path.parts[-(1+periods):-1] + (path.stem, ))
-    if me.endswith('.__init__'):
-        me = me.replace('.__init__', '')
+    if stem == '__init__':
+        me = name
+    else:
+        me = name + '.' + stem
 
     if me in sys.modules:
-        msg = (f"The script at '{file}' already exists as sys.modules['{me}']. " +
-               "Running this script again in sys.modules['__main__'] may result in " +
-               "unpredictable behavior."
-               )
-        warnings.warn(RuntimeWarning(msg), 'always', stacklevel=3)
+        _warn(
+            RuntimeWarning,
+            lambda: (f"The script at '{file}' already exists as sys.modules['{me}']. " +
+                     "Running this script again in sys.modules['__main__'] may result in " +
+                     "unpredictable behavior."
+                     ),
+            stacklevel=3
+        )
 
     p = g.get('__package__', None)
     if p is None:
@@ -157,7 +193,7 @@ def _tive(s, g):
 
     spec = g.get('__spec__', None)
     if spec is None:
-        my_name = name + '.' + path.stem
+        my_name = name + '.' + stem
         g['__spec__'] =  importlib.util.spec_from_loader(my_name, g['__loader__'])
 
     return mod
@@ -175,26 +211,24 @@ def _path(p, g, top):
 
     if '__file__' in g:
         p = os.path.expanduser(p)
-        file = pathlib.Path(g['__file__'])
+        file_dir = os.path.dirname(g['__file__']) or os.curdir
 
-        path = pathlib.Path(file).parent / p
+        path = os.path.join(file_dir, p)
 
         if not orig_p.startswith('.'):
-            relpath = os.path.relpath(path, file.parent)
-            s = '%r -> %r' % (orig_p, relpath)
-            warnings.warn(AbsolutePathWarning(s), 'always', stacklevel=3)
+            _warn(
+                AbsolutePathWarning,
+                lambda: '%r -> %r' % (orig_p, os.path.relpath(path, file_dir)),
+                stacklevel=3
+            )
 
     else:
         # allow .path to work from the shell
-        path = pathlib.Path(p)
+        path = p
 
-    path = path.absolute()
-    p2 = str(path)
     # ensure that p exists in the path
-
-    p2 = os.path.abspath(p2)
-    while p2 in sys.path:
-        sys.path.remove(p2)
+    p2 = os.path.abspath(path)
+    sys.path[:] = [x for x in sys.path if x != p2]
 
     if top:
         sys.path.insert(0, p2)
@@ -206,8 +240,7 @@ def _path(p, g, top):
             return self
         def __exit__(self, *args):
             s = str(self)
-            while s in sys.path:
-                sys.path.remove(s)
+            sys.path[:] = [x for x in sys.path if x != s]
 
     return ContextString(p2)
 
@@ -234,9 +267,9 @@ def if_main_run(run_this_module):
     new_mod = '.'.join(parts) + '.' + mod
 
     msg = f'"{new_mod}" from "{mod_name}"'
-    warnings.warn(
-        IfMainExecuting(f'executing instead: {msg}'),
-        'always',
+    _warn(
+        IfMainExecuting,
+        lambda: f'executing instead: {msg}',
         stacklevel=2
     )
 
@@ -5,11 +5,9 @@
 Helpers for using `unittest`.
 
 '''
-import unittest
-import inspect
-import warnings
+import io
 
-from ._utils import _get_globals
+from ._utils import _get_globals, _warn
 
 
 class RelaTestRunning(Warning):
@@ -26,6 +24,23 @@ class TestCaseFilter(Warning):
 _linesep = '=' * 70
 
 
+def _lineno(cls):
+    ''' line number of the class definition, cached on the class so
+        that stacked decorators only read the source once
+    '''
+    lineno = cls.__dict__.get('_rela_lineno_')
+    if lineno is None:
+        import inspect
+        try:
+            lineno = inspect.getsourcelines(cls)[1]
+        except (OSError, TypeError):
+            lineno = '(not found)'
+        try:
+            cls._rela_lineno_ = lineno
+        except TypeError:
+            pass
+    return lineno
+
 
 def run(**kw):
     """ decorator for unittest.TestCase to run the test suite
@@ -42,24 +57,17 @@ def run(**kw):
     kw.setdefault('verbosity', 2)
     ''' decorator for unittest.TestCase to run'''
     def decorator(cls):
+        import unittest
         assert unittest.TestCase in cls.__mro__
         # run the tests
 
-        try:
-            lineno = inspect.getsourcelines(cls)[1]
-        except (OSError, TypeError):
-            lineno = '(not found)'
-
-        msg = f'on line {lineno}'
-
-        msg_full = msg
-        warnings.warn(
-            RelaTestRunning(msg_full),
-            'always',
+        _warn(
+            RelaTestRunning,
+            lambda: f'on line {_lineno(cls)}',
             stacklevel=2
         )
 
-        suite = unittest.TestLoader().loadTestsFromTestCase(cls)
+        suite = unittest.defaultTestLoader.loadTestsFromTestCase(cls)
         runner = unittest.runner.TextTestRunner(**kw)
         runner.run(suite)
 
@@ -90,56 +98,53 @@ def case():
     # because test runners are hardly configuration friendly :-)
 
     def decorator(cls):
+        import unittest
         assert unittest.TestCase in cls.__mro__
 
-        try:
-            lineno = inspect.getsourcelines(cls)
-        except (OSError, TypeError):
-            lineno = '(not found)'
-
-        msg = f'on line {lineno}.'
-
         keep = []
         remove = []
-        for name in dir(cls):
-            if not name.startswith('test_'):
-                continue
-            obj = getattr(cls, name)
-            if hasattr(obj, '_test_keep__'):
-                line =  obj.__code__.co_firstlineno
-                keep.append((line, f'line {line:4}:  {name}'))
-            else:
-                remove.append(name)
+        # walk the MRO so inherited test methods are filtered too,
+        # the first definition of a name is the one the loader sees
+        seen = set()
+        for klass in cls.__mro__[:-1]:
+            for name in klass.__dict__:
+                if not name.startswith('test_') or name in seen:
+                    continue
+                seen.add(name)
+                # check what the loader sees, not the raw descriptor
+                obj = getattr(cls, name)
+                if not callable(obj):
+                    continue
+                if hasattr(obj, '_test_keep__'):
+                    keep.append((obj.__code__.co_firstlineno, name))
+                else:
+                    remove.append(name)
 
         if keep:
             # we have at least one kept item, we now filter
 
-            keep.sort()
-            keep_line = [m for line, m in keep]
-            kept = '    \n'.join(keep_line)
+            keep.sort(key=lambda item: item[0])
             remove.sort()
 
-            remove_count = len(remove)
-            keep_count = len(keep)
-
-            msg_full = [
-                msg,
-                _linesep,
-                f'Removed {remove_count} tests from {cls}',
-                f'Keeping {keep_count} tests:\n\n{kept}',
-                _linesep,
-            ]
-
-            msg_full = '\n'.join(msg_full)
+            def message():
+                buf = io.StringIO()
+                buf.write(f'on line {_lineno(cls)}.\n')
+                buf.write(_linesep + '\n')
+                buf.write(f'Removed {len(remove)} tests from {cls}\n')
+                buf.write(f'Keeping {len(keep)} tests:\n\n')
+                buf.write('    \n'.join(
+                    [f'line {line:4}:  {name}' for line, name in keep]))
+                buf.write('\n' + _linesep)
+                return buf.getvalue()
 
-            warnings.warn(
-                TestCaseFilter(msg_full),
-                'always',
-                stacklevel=2
-            )
+            _warn(TestCaseFilter, message, stacklevel=2)
 
             for r in remove:
-                delattr(cls, r)
+                if r in cls.__dict__:
+                    delattr(cls, r)
+                if hasattr(cls, r):
+                    # inherited, shadow it so the loader skips it
+                    setattr(cls, r, None)
 
         return cls
 
@@ -2,10 +2,32 @@
 ## See LICENSE.txt for more information.
 
 import sys
+import warnings
 
 def _get_globals(d=2):
-    f  = sys._getframe()
-    for _ in range(d):
-        f = f.f_back
-    g = f.f_globals
-    return g
+    return sys._getframe(d).f_globals
+
+# With context aware warnings (Python 3.14+), catch_warnings changes a
+# context local copy of the filters, not `warnings.filters`, so the
+# shortcut in _warn can't trust the module level list.
+_CONTEXT_WARNINGS = getattr(sys.flags, 'context_aware_warnings', False)
+
+def _warn(category, msg_factory, stacklevel=1):
+    ''' warnings.warn, but `msg_factory()` is only called to build the
+        message if `category` is not unconditionally ignored.
+
+        Only the simple case is short-circuited: the first filter in
+        `warnings.filters` that matches `category` is an 'ignore' with
+        no message, module or line number condition. Anything else is
+        left to `warnings.warn`.
+    '''
+    if not _CONTEXT_WARNINGS:
+        for action, msg, cat, mod, lineno in warnings.filters:
+            if issubclass(category, cat):
+                if (action == 'ignore' and msg is None and
+                        mod is None and not lineno):
+                    return
+                # the first matching filter decides, let warnings do that
+                break
+
+    warnings.warn(msg_factory(), category, stacklevel=stacklevel + 1)
@@ -12,7 +12,7 @@ import pathlib
 import sys
 import types
 import os
-import importlib
+import importlib.util
 import tempfile
 
 
@@ -175,6 +175,24 @@ class TestRela(unittest.TestCase):
         self.assertEqual(self.g['xyz'].value, 123)
         self.assertEqual(self.g['xyz'].__name__, 'package.xyz')
 
+    def test_tive_by_name_nearest(self):
+        # e.g. a project directory with the same name as its package
+        self.fs.update({
+            'package/package/__init__.py': '',
+            'package/package/xyz.py': 'value=123'
+        })
+
+        file = self.fs.path('package/package/aaa.py')
+
+        self.do(str(file), '''if 1:
+            import rela; rela.tive('package')
+            from . import xyz
+        ''')
+
+        self.assertEqual(self.g['xyz'].__name__, 'package.xyz')
+        self.assertEqual(self.g['xyz'].__file__,
+                         str(self.fs.path('package/package/xyz.py')))
+
     def test_not_found(self):
         file = self.fs.path('aaa.py')
         with self.assertRaises(FileNotFoundError):
@@ -200,6 +218,53 @@ class TestRela(unittest.TestCase):
         self.assertEqual(r, set(mods.removed))
         self.assertEqual(self.g['d'].value, 111)
 
+    def test_nested_package(self):
+        self.fs.update({
+            'top/__init__.py': '',
+            'top/a/__init__.py': '',
+            'top/a/b/c/d.py': 'value=111'
+        })
+
+        file = self.fs.path('top/a/b/c/test.py')
+
+        mods = self.do(str(file), '''if 1:
+            import rela; rela.tive('top')
+            from . import d
+        ''')
+        r = set(['top', 'top.a', 'top.a.b', 'top.a.b.c', 'top.a.b.c.d'])
+
+        self.assertEqual(r, set(mods.removed))
+        self.assertEqual(self.g['d'].value, 111)
+        a = mods.removed['top.a']
+        self.assertEqual(a.__file__, str(self.fs.path('top/a/__init__.py')))
+        self.assertIs(mods.removed['top'].a, a)
+
+    def test_nested_package_other_parent(self):
+        # `top` was already imported from elsewhere, don't mix in the
+        # subpackages from the script's directory
+        self.fs.update({
+            'installed/top/__init__.py': '',
+            'dev/top/__init__.py': '',
+            'dev/top/a/__init__.py': '',
+            'dev/top/a/b/c.py': 'value=111'
+        })
+
+        file = self.fs.path('dev/top/a/b/script.py')
+
+        with SysMod():
+            spec = importlib.util.spec_from_file_location(
+                'top', str(self.fs.path('installed/top/__init__.py'))
+            )
+            mod = importlib.util.module_from_spec(spec)
+            sys.modules['top'] = mod
+            spec.loader.exec_module(mod)
+
+            with self.assertRaises(ModuleNotFoundError):
+                self.do(str(file), '''if 1:
+                    import rela; rela.tive('top')
+                ''')
+            self.assertNotIn('top.a', sys.modules)
+
 
     def test_tive_skip_not_main(self):
         self.fs.update({
@@ -342,6 +407,44 @@ class TestRela(unittest.TestCase):
         # make sure RelaModuleFinder removed itself
         self.assertEqual(sys.meta_path, orig_meta)
 
+    def test_repeated_tive(self):
+        self.fs.update({
+            'cached/a.py': 'value=111'
+        })
+        path = self.fs.path('cached')
+        file = self.fs.path('cached/b.py')
+
+        def run():
+            self.g = vars(types.ModuleType('__main__'))
+            mods = self.do(str(file), """if 1:
+                import rela; rela.tive('.')
+                from . import a
+            """)
+            self.assertEqual(self.g['a'].value, 111)
+            return mods.removed['cached']
+
+        # namespace package
+        first = run()
+        second = run()
+
+        self.assertIsNot(second.__spec__, first.__spec__)
+        self.assertIsNot(second.__path__, first.__path__)
+        self.assertEqual(list(second.__path__), list(first.__path__))
+        self.assertEqual(getattr(second, '__file__', None),
+                         getattr(first, '__file__', None))
+        self.assertEqual(hasattr(second, '__file__'),
+                         hasattr(first, '__file__'))
+
+        # adding __init__.py makes it a regular package, changes made
+        # to __path__ by one import must not show up in the next
+        self.fs['cached/__init__.py'] = '__path__.append("/extra")'
+
+        for _ in range(3):
+            mod = run()
+            self.assertEqual(mod.__file__,
+                             str(self.fs.path('cached/__init__.py')))
+            self.assertEqual(mod.__path__, [str(path), '/extra'])
+
     def test_main_not_main(self):
         self.fs.update({
             'test_pack/a.py': 'value=111'
@@ -427,6 +530,53 @@ class TestRela(unittest.TestCase):
             import rela; rela.tive('.')
             ''')
 
+    def test_warn_ignored(self):
+        import warnings
+
+        def factory():
+            raise AssertionError('message built for ignored warning')
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', rela._test.TestCaseFilter)
+            rela._utils._warn(rela._test.TestCaseFilter, factory)
+
+        with self.assertWarns(rela._test.TestCaseFilter):
+            rela._utils._warn(rela._test.TestCaseFilter, lambda: 'shown')
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', rela._test.TestCaseFilter)
+            with self.assertRaisesRegex(rela._test.TestCaseFilter, 'raised'):
+                rela._utils._warn(rela._test.TestCaseFilter, lambda: 'raised')
+
+        # filters that only match some messages are left to warnings
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', 'hidden',
+                                    rela._test.TestCaseFilter)
+            with self.assertWarnsRegex(rela._test.TestCaseFilter, 'shown'):
+                rela._utils._warn(rela._test.TestCaseFilter, lambda: 'shown')
+
+    def test_warn_context_aware(self):
+        # when the module level filters can't be trusted, the message
+        # is always built and warnings.warn decides
+        import warnings
+        built = []
+
+        def factory():
+            built.append(True)
+            return 'built'
+
+        orig = rela._utils._CONTEXT_WARNINGS
+        rela._utils._CONTEXT_WARNINGS = True
+        try:
+            with warnings.catch_warnings(record=True) as w:
+                warnings.simplefilter('ignore', rela._test.TestCaseFilter)
+                rela._utils._warn(rela._test.TestCaseFilter, factory)
+        finally:
+            rela._utils._CONTEXT_WARNINGS = orig
+
+        self.assertEqual(built, [True])
+        self.assertEqual(w, [])
+
     def test_case_keep(self):
         tested = []
 
@@ -444,6 +594,63 @@ class TestRela(unittest.TestCase):
         self.assertIn('test_one', dir(TestThing))
         self.assertNotIn('test_two', dir(TestThing))
 
+    def test_case_lineno(self):
+        with self.assertWarns(rela._test.TestCaseFilter) as cm:
+            @rela.test.case()
+            class TestThing(unittest.TestCase):
+
+                @rela.test.keep()
+                def test_one(self):
+                    pass  # pragma: no cover
+
+                def test_two(self):
+                    pass  # pragma: no cover
+
+        lineno = TestThing.__dict__['_rela_lineno_']
+        self.assertIsInstance(lineno, int)
+        self.assertTrue(str(cm.warning).startswith(f'on line {lineno}.'))
+
+    def test_case_keep_staticmethod(self):
+        with self.assertWarns(rela._test.TestCaseFilter):
+            @rela.test.case()
+            class TestThing(unittest.TestCase):
+
+                @staticmethod
+                @rela.test.keep()
+                def test_a():
+                    pass  # pragma: no cover
+
+                def test_b(self):
+                    pass  # pragma: no cover
+
+        names = unittest.TestLoader().getTestCaseNames(TestThing)
+        self.assertEqual(list(names), ['test_a'])
+
+    def test_case_keep_inherited(self):
+        class Base(unittest.TestCase):
+            def test_base(self):
+                pass  # pragma: no cover
+
+        with self.assertWarns(rela._test.TestCaseFilter):
+            @rela.test.case()
+            class TestThing(Base):
+
+                @rela.test.keep()
+                def test_one(self):
+                    pass  # pragma: no cover
+
+                def test_two(self):
+                    pass  # pragma: no cover
+
+        self.assertIn('test_one', dir(TestThing))
+        self.assertNotIn('test_two', dir(TestThing))
+        self.assertIn('test_base', dir(Base))
+
+        names = unittest.TestLoader().getTestCaseNames(TestThing)
+        self.assertEqual(list(names), ['test_one'])
+        self.assertEqual(list(unittest.TestLoader().getTestCaseNames(Base)),
+                         ['test_base'])
+
     def test_run_cases(self):
 
         file = self.fs.path('case/a.py')